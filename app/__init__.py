@@ -1,18 +1,53 @@
+from decimal import Decimal
+
 from flask import Flask, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_bcrypt import Bcrypt
 from config import Config
+import orjson
 import os
 
-db = SQLAlchemy()
+# expire_on_commit=False keeps ORM objects readable after commit; handlers
+# that return entry.to_dict()/goal.to_dict() right after committing would
+# otherwise trigger a second SELECT per request to reload expired columns
+db = SQLAlchemy(session_options={'expire_on_commit': False})
 jwt = JWTManager()
 bcrypt = Bcrypt()
 
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson.
+
+    Serializes date/datetime/UUID natively in C, so response payloads can
+    carry raw date objects without per-field .isoformat() calls in Python.
+    NumPy arrays and scalars are also serialized natively, so vectorized
+    handlers can hand results straight to jsonify without .tolist()/float()
+    round-trips. Keys stay sorted to match Flask's default provider output.
+    """
+
+    _OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    @staticmethod
+    def _default(obj):
+        if isinstance(obj, Decimal):
+            return float(obj)
+        if isinstance(obj, tuple):
+            return list(obj)
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self._default, option=self._OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    app.json = OrjsonProvider(app)
 
     # CORS Configuration - Allow all origins for development
     CORS(app,
@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from sqlalchemy import (Column, String, Integer, DECIMAL, Text, Date, DateTime, Time, Enum, ForeignKey, Boolean)
+from sqlalchemy import (Column, String, Integer, DECIMAL, Text, Date, DateTime, Time, Enum, ForeignKey, Boolean, Index, SmallInteger, TypeDecorator)
 from sqlalchemy.dialects.mysql import TINYINT
 from sqlalchemy.orm import relationship
 from app import db
@@ -8,6 +8,35 @@ from app import db
 def generate_uuid():
     return str(uuid.uuid4())
 
+
+class PhaseType(TypeDecorator):
+    """Stores weight_goals.current_phase as a 1-byte TINYINT code while the
+    application keeps reading and writing the phase name strings. Adding a
+    phase later is a dict entry here, not an ENUM ALTER and table rebuild."""
+    impl = SmallInteger
+    cache_ok = True
+
+    _TO_INT = {'priming': 0, 'fat_loss': 1, 'diet_break': 2, 'final_push': 3}
+    _TO_NAME = {code: name for name, code in _TO_INT.items()}
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == 'mysql':
+            return dialect.type_descriptor(TINYINT(unsigned=True))
+        return dialect.type_descriptor(SmallInteger())
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        try:
+            return self._TO_INT[value]
+        except KeyError:
+            raise ValueError(f"Invalid phase: {value!r}") from None
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return self._TO_NAME[value]
+
 class User(db.Model):
     __tablename__ = 'Users'
     id = Column(String(36), primary_key=True, default=generate_uuid)
@@ -93,6 +122,11 @@ class Commitment(db.Model):
 
 class Meal(db.Model):
     __tablename__ = 'meals'
+    # The daily-review, weekly-summary and meal-timing queries all filter by
+    # user_id plus a meal_date equality or range
+    __table_args__ = (
+        Index('ix_meals_user_date', 'user_id', 'meal_date'),
+    )
     id = Column(String(36), primary_key=True, default=generate_uuid)
     user_id = Column(String(36), ForeignKey('Users.id'), nullable=False)
     commit_id = Column(String(36), ForeignKey('commitments.id'), nullable=True)
@@ -148,6 +182,11 @@ class Note(db.Model):
 
 class WeightEntry(db.Model):
     __tablename__ = 'weight_entries'
+    # Matches idx_user_date created by migrations/add_weight_management_tables.py;
+    # the hot queries all filter by user_id + date range and sort by date.
+    __table_args__ = (
+        Index('idx_user_date', 'user_id', 'date'),
+    )
     id = Column(String(36), primary_key=True, default=generate_uuid)
     user_id = Column(String(36), ForeignKey('Users.id'), nullable=False)
     weight_kg = Column(DECIMAL(5, 2), nullable=False)
@@ -175,12 +214,18 @@ class WeightGoal(db.Model):
     goal_weight = Column(DECIMAL(5, 2), nullable=False)
     height_cm = Column(Integer, nullable=False)
     target_date = Column(Date, nullable=False)
-    current_phase = Column(Enum('priming', 'fat_loss', 'diet_break', 'final_push'), default='priming')
+    current_phase = Column(PhaseType, default='priming')
     phase_start_date = Column(Date, nullable=False)
     daily_calorie_target = Column(Integer, nullable=False)
     daily_protein_target = Column(Integer, nullable=False)
     daily_carbs_target = Column(Integer)
     daily_fat_target = Column(Integer)
+    # Per-phase protein targets quantized once at goal creation so phase
+    # plans don't recompute int(starting_weight * multiplier) per request
+    priming_protein_g = Column(Integer)
+    fat_loss_protein_g = Column(Integer)
+    diet_break_protein_g = Column(Integer)
+    final_push_protein_g = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -2,11 +2,64 @@
 Utility functions for weight management and nutrition calculations
 """
 from datetime import datetime, timedelta
+from functools import lru_cache
+import numpy as np
 from dateutil.relativedelta import relativedelta
+from sqlalchemy import Float, bindparam, cast, func, text
+from app import db
 from app.models import WeightEntry
 
 
-def calculate_phases(starting_weight, goal_weight, target_date, start_date=None):
+# Phase plan specs, in journey order:
+# (phase, name, calories, protein multiplier, carbs, fat, expected loss,
+#  description, duration delta, duration_days)
+# A None duration means the phase runs until target_date.
+_PHASE_SPECS = (
+    ('priming', 'Month 1 - Metabolic Priming', 2350, 1.65, 250, 70,
+     '0.5-1', 'Restore metabolic function before dieting',
+     relativedelta(months=1), 30),
+    ('fat_loss', 'Phase 1 - Fat Loss', 2050, 1.75, 200, 65,
+     '18-20', 'Sustainable fat loss with muscle preservation',
+     relativedelta(months=9), 270),
+    ('diet_break', 'Diet Break', 2400, 1.65, 300, 70,
+     '0', 'Restore hormones and take psychological break',
+     timedelta(days=14), 14),
+    ('final_push', 'Phase 3 - Final Push', 1950, 1.80, 180, 60,
+     '6-8', 'Final push to goal weight',
+     None, None),
+)
+
+
+def _build_phase(spec, start_date, end_date, duration_days, starting_weight, weight_goal=None):
+    """Build one phase dict from its spec tuple and resolved dates."""
+    phase, name, calories, protein_mult, carbs, fat, expected_loss, description = spec[:8]
+
+    # Prefer the protein target quantized at goal creation; fall back to
+    # recomputing from the multiplier for standalone calls
+    protein = None
+    if weight_goal is not None:
+        protein = getattr(weight_goal, phase + '_protein_g', None)
+    if protein is None:
+        protein = int(starting_weight * protein_mult)
+
+    return {
+        'name': name,
+        'phase': phase,
+        # Raw date objects: the orjson provider formats these in C at
+        # response time, so no .isoformat() strings are built here.
+        'start_date': start_date,
+        'end_date': end_date,
+        'duration_days': duration_days,
+        'daily_calorie_target': calories,
+        'daily_protein_target': protein,
+        'daily_carbs_target': carbs,
+        'daily_fat_target': fat,
+        'expected_loss_kg': expected_loss,
+        'description': description
+    }
+
+
+def calculate_phases(starting_weight, goal_weight, target_date, start_date=None, weight_goal=None):
     """
     Calculate all phases with dates and targets based on weight loss plan.
 
@@ -15,6 +68,8 @@ def calculate_phases(starting_weight, goal_weight, target_date, start_date=None)
         goal_weight: Target weight in kg
         target_date: Target completion date
         start_date: Start date (default: today)
+        weight_goal: Optional WeightGoal whose stored per-phase protein
+            targets are reused instead of recomputing them
 
     Returns:
         List of phase dictionaries with dates, calories, protein targets
@@ -25,130 +80,117 @@ def calculate_phases(starting_weight, goal_weight, target_date, start_date=None)
     phases = []
     current_date = start_date
 
-    # Phase 0: Metabolic Priming (1 month)
-    phases.append({
-        'name': 'Month 1 - Metabolic Priming',
-        'phase': 'priming',
-        'start_date': current_date.isoformat(),
-        'end_date': (current_date + relativedelta(months=1)).isoformat(),
-        'duration_days': 30,
-        'daily_calorie_target': 2350,
-        'daily_protein_target': int(starting_weight * 1.65),
-        'daily_carbs_target': 250,
-        'daily_fat_target': 70,
-        'expected_loss_kg': '0.5-1',
-        'description': 'Restore metabolic function before dieting'
-    })
-    current_date += relativedelta(months=1)
-
-    # Phase 1: Fat Loss (9 months)
-    phases.append({
-        'name': 'Phase 1 - Fat Loss',
-        'phase': 'fat_loss',
-        'start_date': current_date.isoformat(),
-        'end_date': (current_date + relativedelta(months=9)).isoformat(),
-        'duration_days': 270,
-        'daily_calorie_target': 2050,
-        'daily_protein_target': int(starting_weight * 1.75),
-        'daily_carbs_target': 200,
-        'daily_fat_target': 65,
-        'expected_loss_kg': '18-20',
-        'description': 'Sustainable fat loss with muscle preservation'
-    })
-    current_date += relativedelta(months=9)
-
-    # Diet Break (2 weeks)
-    phases.append({
-        'name': 'Diet Break',
-        'phase': 'diet_break',
-        'start_date': current_date.isoformat(),
-        'end_date': (current_date + timedelta(days=14)).isoformat(),
-        'duration_days': 14,
-        'daily_calorie_target': 2400,
-        'daily_protein_target': int(starting_weight * 1.65),
-        'daily_carbs_target': 300,
-        'daily_fat_target': 70,
-        'expected_loss_kg': '0',
-        'description': 'Restore hormones and take psychological break'
-    })
-    current_date += timedelta(days=14)
-
-    # Phase 3: Final Push (remaining time to target_date)
-    days_remaining = (target_date - current_date).days
-    phases.append({
-        'name': 'Phase 3 - Final Push',
-        'phase': 'final_push',
-        'start_date': current_date.isoformat(),
-        'end_date': target_date.isoformat(),
-        'duration_days': days_remaining,
-        'daily_calorie_target': 1950,
-        'daily_protein_target': int(starting_weight * 1.80),
-        'daily_carbs_target': 180,
-        'daily_fat_target': 60,
-        'expected_loss_kg': '6-8',
-        'description': 'Final push to goal weight'
-    })
+    for spec in _PHASE_SPECS:
+        delta, duration_days = spec[8], spec[9]
+        if delta is None:
+            # Final phase takes whatever time remains until target_date
+            end_date = target_date
+            duration_days = (target_date - current_date).days
+        else:
+            end_date = current_date + delta
+        phases.append(_build_phase(spec, current_date, end_date, duration_days,
+                                   starting_weight, weight_goal))
+        current_date = end_date
 
     return phases
 
 
-def get_current_phase_info(weight_goal):
+# Static per-phase metadata: (name, description, expected_change, duration_days).
+# final_push has no fixed duration - it runs until target_date, so its entry
+# stores None and the duration is computed on demand in get_current_phase_info.
+_PHASE_META = {
+    'priming': (
+        'Month 1 - Metabolic Priming',
+        'Restoring metabolism, building sustainable habits',
+        '-0.5 to -1kg this month',
+        30
+    ),
+    'fat_loss': (
+        'Phase 1 - Fat Loss',
+        'Active fat loss with muscle preservation',
+        '-2 to -3kg per month',
+        270
+    ),
+    'diet_break': (
+        'Diet Break',
+        'Maintenance phase to restore hormones',
+        'Maintain current weight',
+        14
+    ),
+    'final_push': (
+        'Phase 3 - Final Push',
+        'Final phase to reach goal weight',
+        '-1.5 to -2kg per month',
+        None
+    )
+}
+
+
+def get_current_phase_info(weight_goal, today=None):
     """
     Get detailed info about user's current phase.
 
     Args:
         weight_goal: WeightGoal model instance
+        today: Current date (default: today); callers handling several
+            goals in one request can pass a single cached value
 
     Returns:
         dict with phase information
     """
-    today = datetime.now().date()
+    if today is None:
+        today = datetime.now().date()
     phase_start = weight_goal.phase_start_date
     days_in_phase = (today - phase_start).days
 
-    # Determine phase duration
-    phase_durations = {
-        'priming': 30,
-        'fat_loss': 270,
-        'diet_break': 14,
-        'final_push': (weight_goal.target_date - today).days
-    }
-
-    total_days = phase_durations.get(weight_goal.current_phase, 30)
-    days_remaining = max(0, total_days - days_in_phase)
+    phase = weight_goal.current_phase
+    phase_name, phase_description, expected_change, total_days = _PHASE_META[phase]
 
-    phase_names = {
-        'priming': 'Month 1 - Metabolic Priming',
-        'fat_loss': 'Phase 1 - Fat Loss',
-        'diet_break': 'Diet Break',
-        'final_push': 'Phase 3 - Final Push'
-    }
+    # Only final_push has a dynamic duration (time left until target date)
+    if total_days is None:
+        total_days = (weight_goal.target_date - today).days
 
-    phase_descriptions = {
-        'priming': 'Restoring metabolism, building sustainable habits',
-        'fat_loss': 'Active fat loss with muscle preservation',
-        'diet_break': 'Maintenance phase to restore hormones',
-        'final_push': 'Final phase to reach goal weight'
-    }
-
-    expected_changes = {
-        'priming': '-0.5 to -1kg this month',
-        'fat_loss': '-2 to -3kg per month',
-        'diet_break': 'Maintain current weight',
-        'final_push': '-1.5 to -2kg per month'
-    }
+    days_remaining = max(0, total_days - days_in_phase)
 
     return {
-        'phase': weight_goal.current_phase,
-        'phase_name': phase_names[weight_goal.current_phase],
-        'phase_description': phase_descriptions[weight_goal.current_phase],
+        'phase': phase,
+        'phase_name': phase_name,
+        'phase_description': phase_description,
         'day_in_phase': days_in_phase,
         'total_days': total_days,
         'days_remaining': days_remaining,
-        'expected_change': expected_changes[weight_goal.current_phase]
+        'expected_change': expected_change
     }
 
 
+def _adherence_kernel_scalar(cal_percentage, protein_percentage):
+    """
+    Pure-numeric scoring kernel: floats in, int out, no dict access.
+
+    Branchless piecewise scoring: each comparison yields 0/1, so exactly
+    one band contributes per component and there are no data-dependent
+    jumps or per-call list allocations.
+    """
+    # Calorie adherence (within 10% of target = 100 points, within 20% = 80,
+    # then falling off linearly with distance from target)
+    cal_delta = abs(cal_percentage - 100)
+    cal_score = (
+        100.0 * (cal_delta <= 10)
+        + 80.0 * (10 < cal_delta <= 20)
+        + max(0.0, 100.0 - cal_delta) * (cal_delta > 20)
+    )
+
+    # Protein adherence (>95% of target = 100 points)
+    protein_score = (
+        100.0 * (protein_percentage >= 95)
+        + 80.0 * (80 <= protein_percentage < 95)
+        + protein_percentage * (protein_percentage < 80)
+    )
+
+    # Macro balance contributes a flat 100 for now (20% weight)
+    return int(cal_score * 0.4 + protein_score * 0.4 + 100 * 0.2)
+
+
 def calculate_adherence_score(totals, targets):
     """
     Calculate overall adherence score (0-100) based on hitting targets.
@@ -160,53 +202,92 @@ def calculate_adherence_score(totals, targets):
     Returns:
         int score from 0-100
     """
-    scores = []
-
-    # Calorie adherence (90-110% of target = 100 points)
-    cal_percentage = (totals['calories'] / targets['calories']) * 100
-    if 90 <= cal_percentage <= 110:
-        cal_score = 100
-    elif 80 <= cal_percentage < 90 or 110 < cal_percentage <= 120:
-        cal_score = 80
-    else:
-        cal_score = max(0, 100 - abs(100 - cal_percentage))
-    scores.append(cal_score * 0.4)  # 40% weight
+    return _adherence_kernel_scalar(
+        (totals['calories'] / targets['calories']) * 100,
+        (totals['protein'] / targets['protein']) * 100
+    )
 
-    # Protein adherence (>95% of target = 100 points)
-    protein_percentage = (totals['protein'] / targets['protein']) * 100
-    if protein_percentage >= 95:
-        protein_score = 100
-    elif protein_percentage >= 80:
-        protein_score = 80
-    else:
-        protein_score = protein_percentage
-    scores.append(protein_score * 0.4)  # 40% weight
 
-    # Macro balance (20% weight)
-    macro_score = 100  # Default, can add more complex logic
-    scores.append(macro_score * 0.2)
+def calculate_adherence_scores_bulk(calories, calorie_targets, proteins, protein_targets):
+    """
+    Vectorized calculate_adherence_score for scoring many days at once
+    (e.g. every day of a 270-day fat-loss phase in one report).
+
+    Applies the same piecewise bands as the scalar function, but over
+    whole NumPy arrays so N days are scored without per-day Python
+    interpreter overhead.
+
+    Args:
+        calories: array-like of daily calorie totals
+        calorie_targets: array-like of daily calorie targets
+        proteins: array-like of daily protein totals
+        protein_targets: array-like of daily protein targets
+
+    Returns:
+        np.ndarray of int scores from 0-100, one per day
+    """
+    cal_pct = np.asarray(calories, dtype=np.float64) / np.asarray(calorie_targets, dtype=np.float64) * 100.0
+    # np.abs on a float64 array is a vectorized sign-bit clear, no branches
+    cal_delta = np.abs(cal_pct - 100.0)
+    in_10 = cal_delta <= 10.0
+    in_20 = cal_delta <= 20.0
+    cal_score = (
+        100.0 * in_10
+        + 80.0 * (in_20 & ~in_10)
+        + np.maximum(0.0, 100.0 - cal_delta) * ~in_20
+    )
+
+    protein_pct = np.asarray(proteins, dtype=np.float64) / np.asarray(protein_targets, dtype=np.float64) * 100.0
+    at_95 = protein_pct >= 95.0
+    at_80 = protein_pct >= 80.0
+    protein_score = (
+        100.0 * at_95
+        + 80.0 * (at_80 & ~at_95)
+        + protein_pct * ~at_80
+    )
+
+    return (cal_score * 0.4 + protein_score * 0.4 + 100 * 0.2).astype(np.int64)
 
-    return int(sum(scores))
+
+# Letter grade per 10-point band, indexed by score // 10 (0-100 clamped)
+_GRADE_TABLE = 'FFFFFFDCBAA'
 
 
 def calculate_grade(adherence_score):
     """Convert adherence score to letter grade."""
-    if adherence_score >= 90:
-        return 'A'
-    elif adherence_score >= 80:
-        return 'B'
-    elif adherence_score >= 70:
-        return 'C'
-    elif adherence_score >= 60:
-        return 'D'
+    return _GRADE_TABLE[max(0, min(adherence_score, 100)) // 10]
+
+
+_ACTIVITY_MULTIPLIERS = {
+    'sedentary': 1.2,
+    'light': 1.375,
+    'moderate': 1.55,
+    'active': 1.725,
+    'very_active': 1.9
+}
+
+
+@lru_cache(maxsize=4096)
+def _bmr_tdee_cached(weight_kg, height_cm, age, sex, activity_level):
+    """Pure cached core of calculate_bmr_tdee, returning an immutable tuple."""
+    if sex == 'male':
+        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) + 5
     else:
-        return 'F'
+        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) - 161
+
+    tdee = bmr * _ACTIVITY_MULTIPLIERS.get(activity_level, 1.2)
+
+    return int(bmr), int(tdee)
 
 
 def calculate_bmr_tdee(weight_kg, height_cm, age, sex='male', activity_level='sedentary'):
     """
     Calculate BMR using Mifflin-St Jeor equation and TDEE.
 
+    The computation is memoized on the argument tuple since it is a pure
+    function that tends to be called repeatedly with the same values for
+    a given user.
+
     Args:
         weight_kg: Weight in kg
         height_cm: Height in cm
@@ -217,90 +298,70 @@ def calculate_bmr_tdee(weight_kg, height_cm, age, sex='male', activity_level='se
     Returns:
         dict with bmr and tdee
     """
-    if sex == 'male':
-        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) + 5
-    else:
-        bmr = (10 * weight_kg) + (6.25 * height_cm) - (5 * age) - 161
-
-    activity_multipliers = {
-        'sedentary': 1.2,
-        'light': 1.375,
-        'moderate': 1.55,
-        'active': 1.725,
-        'very_active': 1.9
-    }
-
-    tdee = bmr * activity_multipliers.get(activity_level, 1.2)
-
+    bmr, tdee = _bmr_tdee_cached(weight_kg, height_cm, age, sex, activity_level)
     return {
-        'bmr': int(bmr),
-        'tdee': int(tdee)
+        'bmr': bmr,
+        'tdee': tdee
     }
 
 
-def check_for_plateau(user_id, weeks_threshold=2):
-    """
-    Check if user has been at same weight for specified weeks.
-
-    Args:
-        user_id: User ID
-        weeks_threshold: Number of weeks to check for plateau
-
-    Returns:
-        dict with plateau status and recommendations
-    """
-    # Get weight entries for last N weeks
-    cutoff_date = datetime.now().date() - timedelta(weeks=weeks_threshold)
-
-    entries = WeightEntry.query.filter(
-        WeightEntry.user_id == user_id,
-        WeightEntry.date >= cutoff_date
-    ).order_by(WeightEntry.date.asc()).all()
-
-    if len(entries) < 2:
+# Shared, immutable recommendation sets for plateau responses, selected by
+# how long the stall has lasted. Tuples serialize to JSON arrays just like
+# lists but cost nothing to hand out per call.
+_REC_DIET_BREAK = (
+    "Take a 1-week diet break at maintenance calories (2,400-2,500)",
+    "Increase daily steps by 2,000",
+    "Focus on strength gains in the gym",
+    "Check body measurements - you may still be losing fat",
+    "Consider if you're at 100kg barrier (expected per your history)"
+)
+
+_REC_ACTIVITY = (
+    "Increase NEAT (add 2,000 steps daily)",
+    "Add one more cardio session this week",
+    "Check food tracking accuracy",
+    "Take progress photos and measurements",
+    "Be patient - plateaus are normal"
+)
+
+_REC_MONITOR = (
+    "Continue current plan",
+    "Weight fluctuates normally",
+    "Focus on non-scale victories",
+    "Check again next week if no change"
+)
+
+
+def _plateau_result(entry_count, first_weight, last_weight):
+    """Build the plateau-status dict from window aggregates for one user."""
+    if entry_count < 2:
         return {
             'is_plateau': False,
             'message': 'Not enough data to determine plateau',
             'weeks_at_same_weight': 0
         }
 
-    first_weight = float(entries[0].weight_kg)
-    last_weight = float(entries[-1].weight_kg)
     weight_change = abs(last_weight - first_weight)
 
     # Plateau if less than 0.5kg change in the period
     is_plateau = weight_change < 0.5
 
     if is_plateau:
-        weeks = len(entries) // 7 if len(entries) >= 7 else len(entries) / 7
+        # Plain float division is type-stable and branchless; the integer
+        # comparisons and int() casts below floor it exactly as the old
+        # int/float split did.
+        weeks = entry_count / 7.0
 
         # Get recommendations based on duration
         if weeks >= 4:
             action = 'diet_break'
-            recommendations = [
-                "Take a 1-week diet break at maintenance calories (2,400-2,500)",
-                "Increase daily steps by 2,000",
-                "Focus on strength gains in the gym",
-                "Check body measurements - you may still be losing fat",
-                "Consider if you're at 100kg barrier (expected per your history)"
-            ]
+            recommendations = _REC_DIET_BREAK
         elif weeks >= 3:
             action = 'activity_increase'
-            recommendations = [
-                "Increase NEAT (add 2,000 steps daily)",
-                "Add one more cardio session this week",
-                "Check food tracking accuracy",
-                "Take progress photos and measurements",
-                "Be patient - plateaus are normal"
-            ]
+            recommendations = _REC_ACTIVITY
         else:
             action = 'monitor'
-            recommendations = [
-                "Continue current plan",
-                "Weight fluctuates normally",
-                "Focus on non-scale victories",
-                "Check again next week if no change"
-            ]
+            recommendations = _REC_MONITOR
 
         return {
             'is_plateau': True,
@@ -318,3 +379,108 @@ def check_for_plateau(user_id, weeks_threshold=2):
             'message': 'Weight is trending down normally. Keep going!',
             'action_needed': None
         }
+
+
+def check_for_plateau(user_id, weeks_threshold=2, today=None):
+    """
+    Check if user has been at same weight for specified weeks.
+
+    Args:
+        user_id: User ID
+        weeks_threshold: Number of weeks to check for plateau
+        today: Current date (default: today); callers checking many users
+            in one pass can share a single cached value
+
+    Returns:
+        dict with plateau status and recommendations
+    """
+    # Get weight entries for last N weeks
+    if today is None:
+        today = datetime.now().date()
+    cutoff_date = today - timedelta(weeks=weeks_threshold)
+
+    # All three queries below rely on the composite idx_user_date
+    # (user_id, date) index on weight_entries: the BETWEEN range plus the
+    # date ordering resolve to an index range scan with no filesort.
+    #
+    # Cheap count probe first: users without enough entries in the window
+    # (the common cold-start case) return before any weight lookups run.
+    entry_count = db.session.query(func.count(WeightEntry.id)).filter(
+        WeightEntry.user_id == user_id,
+        WeightEntry.date.between(cutoff_date, today)
+    ).scalar()
+
+    if entry_count < 2:
+        return {
+            'is_plateau': False,
+            'message': 'Not enough data to determine plateau',
+            'weeks_at_same_weight': 0
+        }
+
+    # Cast to float in SQL so the driver hands back a native float instead
+    # of a Decimal that would need a slow string-based conversion here
+    first_weight = db.session.query(cast(WeightEntry.weight_kg, Float)).filter(
+        WeightEntry.user_id == user_id,
+        WeightEntry.date.between(cutoff_date, today)
+    ).order_by(WeightEntry.date.asc()).limit(1).scalar()
+
+    last_weight = db.session.query(cast(WeightEntry.weight_kg, Float)).filter(
+        WeightEntry.user_id == user_id,
+        WeightEntry.date.between(cutoff_date, today)
+    ).order_by(WeightEntry.date.desc()).limit(1).scalar()
+
+    return _plateau_result(entry_count, first_weight, last_weight)
+
+
+# Per-user first/last weight and entry count in one round-trip, via window
+# functions - used by check_for_plateau_bulk to avoid N single-user queries.
+_BULK_PLATEAU_SQL = text("""
+    SELECT DISTINCT user_id,
+           COUNT(*) OVER (PARTITION BY user_id) AS entry_count,
+           FIRST_VALUE(weight_kg) OVER w AS first_weight,
+           LAST_VALUE(weight_kg) OVER w AS last_weight
+    FROM weight_entries
+    WHERE user_id IN :user_ids AND date BETWEEN :cutoff AND :today
+    WINDOW w AS (PARTITION BY user_id ORDER BY date
+                 ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+""").bindparams(bindparam('user_ids', expanding=True))
+
+
+def check_for_plateau_bulk(user_ids, weeks_threshold=2, today=None):
+    """
+    Check plateau status for many users in a single query.
+
+    Intended for batch callers (cron jobs, admin dashboards) where running
+    check_for_plateau per user would mean one round-trip each; the window
+    query returns first/last weight and entry count per user in one shot.
+
+    Args:
+        user_ids: Iterable of user IDs to check
+        weeks_threshold: Number of weeks to check for plateau
+        today: Current date (default: today)
+
+    Returns:
+        dict mapping user_id to the same dict check_for_plateau returns
+    """
+    user_ids = list(user_ids)
+    if today is None:
+        today = datetime.now().date()
+    cutoff_date = today - timedelta(weeks=weeks_threshold)
+
+    rows = db.session.execute(_BULK_PLATEAU_SQL, {
+        'user_ids': user_ids,
+        'cutoff': cutoff_date,
+        'today': today
+    }).all()
+
+    results = {
+        row.user_id: _plateau_result(row.entry_count, float(row.first_weight), float(row.last_weight))
+        for row in rows
+    }
+
+    # Users with no entries in the window don't appear in the result set
+    for user_id in user_ids:
+        if user_id not in results:
+            results[user_id] = _plateau_result(0, 0.0, 0.0)
+
+    return results
@@ -1,12 +1,73 @@
+import threading
+from bisect import bisect_left
+
+from cachetools import TTLCache
 from flask import Blueprint, request, jsonify
+import numpy as np
 from app.models import WeightEntry, WeightGoal
 from app import db
-from datetime import datetime, timedelta
-from sqlalchemy import desc
+from datetime import date, datetime, timedelta
+from sqlalchemy import bindparam, desc, select, update
 from app.views.utils.weight_utils import calculate_phases, get_current_phase_info
 
 weight_bp = Blueprint('weight', __name__)
 
+# Built once at import: per-request calls only bind the user id instead of
+# rebuilding and recompiling the same SELECT on every endpoint hit
+_GOAL_BY_USER = select(WeightGoal).where(WeightGoal.user_id == bindparam('uid'))
+
+# Daily-review grading: bisecting the cutoffs lands on the grade directly
+# (<=5 A, <=10 B, <=20 C, <=30 D, else F) without a branch chain
+_GRADE_CUTOFFS = (5, 10, 20, 30)
+_GRADES = 'ABCDF'
+
+
+# Per-process goal cache: a user's goal row only changes through the write
+# endpoints, which evict it below, so read endpoints can skip the SELECT
+# for up to a minute. Sized well above the active-user count per worker.
+# cachetools caches are not thread-safe and the dev server is threaded,
+# so every access goes through the lock (held only around the cache op,
+# never across the DB round trip)
+_GOAL_CACHE = TTLCache(maxsize=10000, ttl=60)
+_GOAL_CACHE_LOCK = threading.Lock()
+
+
+def _get_goal(user_id):
+    """Fetch a user's WeightGoal, served from the TTL cache when warm.
+
+    Cached instances are detached from the current session, so they are
+    read-only; handlers that mutate the goal must load it fresh with
+    _get_goal_for_update.
+    """
+    with _GOAL_CACHE_LOCK:
+        goal = _GOAL_CACHE.get(user_id)
+    if goal is None:
+        goal = db.session.execute(_GOAL_BY_USER, {'uid': user_id}).scalar_one_or_none()
+        if goal is not None:
+            with _GOAL_CACHE_LOCK:
+                _GOAL_CACHE[user_id] = goal
+    return goal
+
+
+def _get_goal_for_update(user_id):
+    """Fetch a session-bound WeightGoal for handlers that will write to it."""
+    return db.session.execute(_GOAL_BY_USER, {'uid': user_id}).scalar_one_or_none()
+
+
+def _max_stall(weekly_avgs, threshold=0.25):
+    """
+    Longest run of consecutive week-over-week changes below threshold,
+    computed over NumPy arrays instead of a Python loop.
+    """
+    changes_stalled = np.abs(np.diff(np.asarray(weekly_avgs, dtype=np.float64))) < threshold
+    if not changes_stalled.any():
+        return 0
+    # Running stall length = cumulative True count minus the count at the
+    # most recent False; the max over the array is the longest run
+    cumulative = np.cumsum(changes_stalled)
+    resets = np.maximum.accumulate(np.where(~changes_stalled, cumulative, 0))
+    return int((cumulative - resets).max())
+
 
 @weight_bp.route('/entry', methods=['POST'])
 def add_weight_entry():
@@ -19,7 +80,7 @@ def add_weight_entry():
 
         # Parse date
         try:
-            entry_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+            entry_date = date.fromisoformat(data['date'])
         except ValueError:
             return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
 
@@ -33,12 +94,18 @@ def add_weight_entry():
 
         db.session.add(entry)
 
-        # Update current_weight in weight_goal if exists
-        goal = WeightGoal.query.filter_by(user_id=data['user_id']).first()
-        if goal:
-            goal.current_weight = data['weight_kg']
+        # Update current_weight in weight_goal if it exists - one UPDATE in
+        # the same transaction instead of a SELECT + ORM load + flush
+        db.session.execute(
+            update(WeightGoal)
+            .where(WeightGoal.user_id == data['user_id'])
+            .values(current_weight=data['weight_kg'])
+            .execution_options(synchronize_session=False)
+        )
 
         db.session.commit()
+        with _GOAL_CACHE_LOCK:
+            _GOAL_CACHE.pop(data['user_id'], None)
 
         return jsonify({
             'success': True,
@@ -65,25 +132,40 @@ def get_weight_entries(user_id):
         # Apply date filters
         if start_date_str:
             try:
-                start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+                start_date = date.fromisoformat(start_date_str)
                 query = query.filter(WeightEntry.date >= start_date)
             except ValueError:
                 return jsonify({"error": "Invalid start_date format. Use YYYY-MM-DD"}), 400
 
         if end_date_str:
             try:
-                end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+                end_date = date.fromisoformat(end_date_str)
                 query = query.filter(WeightEntry.date <= end_date)
             except ValueError:
                 return jsonify({"error": "Invalid end_date format. Use YYYY-MM-DD"}), 400
 
-        # Get entries
-        entries = query.order_by(desc(WeightEntry.date)).limit(limit).all()
+        # Fetch plain column tuples - no WeightEntry instances or identity-map
+        # bookkeeping per row; the orjson provider formats dates at encode time
+        rows = query.with_entities(
+            WeightEntry.id,
+            WeightEntry.user_id,
+            WeightEntry.weight_kg,
+            WeightEntry.date,
+            WeightEntry.notes,
+            WeightEntry.created_at
+        ).order_by(desc(WeightEntry.date)).limit(limit).all()
 
         return jsonify({
             'success': True,
-            'data': [entry.to_dict() for entry in entries],
-            'count': len(entries)
+            'data': [{
+                'id': row.id,
+                'user_id': row.user_id,
+                'weight_kg': float(row.weight_kg),
+                'date': row.date,
+                'notes': row.notes,
+                'created_at': row.created_at
+            } for row in rows],
+            'count': len(rows)
         }), 200
 
     except Exception as e:
@@ -96,11 +178,14 @@ def get_weight_trend(user_id):
     try:
         days = request.args.get('days', 30, type=int)
 
-        # Get entries for last N days
+        # Get entries for last N days - only the two columns the trend needs
         cutoff_date = datetime.now().date() - timedelta(days=days)
         entries = WeightEntry.query.filter(
             WeightEntry.user_id == user_id,
             WeightEntry.date >= cutoff_date
+        ).with_entities(
+            WeightEntry.date,
+            WeightEntry.weight_kg
         ).order_by(WeightEntry.date.asc()).all()
 
         if not entries:
@@ -114,12 +199,14 @@ def get_weight_trend(user_id):
                 }
             }), 200
 
-        # Calculate trend
-        entry_data = [{'date': e.date.isoformat(), 'weight_kg': float(e.weight_kg)} for e in entries]
+        # Calculate trend over one contiguous weights array; the Decimal
+        # conversion happens once here and .tolist() hands back native floats
+        weights = np.fromiter((float(e.weight_kg) for e in entries),
+                              dtype=np.float64, count=len(entries))
+        entry_data = [{'date': e.date, 'weight_kg': w}
+                      for e, w in zip(entries, weights.tolist())]
 
-        first_weight = float(entries[0].weight_kg)
-        last_weight = float(entries[-1].weight_kg)
-        total_loss = last_weight - first_weight
+        total_loss = float(weights[-1] - weights[0])
 
         # Calculate average weekly loss
         days_span = (entries[-1].date - entries[0].date).days
@@ -162,24 +249,25 @@ def setup_goal():
 
         # Parse target date
         try:
-            target_date = datetime.strptime(data['target_date'], '%Y-%m-%d').date()
+            target_date = date.fromisoformat(data['target_date'])
         except ValueError:
             return jsonify({"error": "Invalid target_date format. Use YYYY-MM-DD"}), 400
 
         # Check if goal already exists
-        existing_goal = WeightGoal.query.filter_by(user_id=data['user_id']).first()
+        existing_goal = _get_goal(data['user_id'])
         if existing_goal:
             return jsonify({"error": "Weight goal already exists for this user. Use update endpoint instead."}), 400
 
-        # Calculate phases
+        # Calculate phases (reuse one "today" for the phase plan and the goal row)
+        today = datetime.now().date()
         phases = calculate_phases(
             data['starting_weight'],
             data['goal_weight'],
-            target_date
+            target_date,
+            start_date=today
         )
 
         # Create weight goal with first phase settings
-        today = datetime.now().date()
         first_phase = phases[0]
 
         goal = WeightGoal(
@@ -194,11 +282,19 @@ def setup_goal():
             daily_calorie_target=first_phase['daily_calorie_target'],
             daily_protein_target=first_phase['daily_protein_target'],
             daily_carbs_target=first_phase['daily_carbs_target'],
-            daily_fat_target=first_phase['daily_fat_target']
+            daily_fat_target=first_phase['daily_fat_target'],
+            # Quantize per-phase protein targets once at creation so later
+            # phase-plan reads skip the float multiply + int() per phase
+            priming_protein_g=phases[0]['daily_protein_target'],
+            fat_loss_protein_g=phases[1]['daily_protein_target'],
+            diet_break_protein_g=phases[2]['daily_protein_target'],
+            final_push_protein_g=phases[3]['daily_protein_target']
         )
 
         db.session.add(goal)
         db.session.commit()
+        with _GOAL_CACHE_LOCK:
+            _GOAL_CACHE.pop(data['user_id'], None)
 
         return jsonify({
             'success': True,
@@ -217,7 +313,23 @@ def setup_goal():
 def get_current_phase(user_id):
     """Get current phase information and targets"""
     try:
-        goal = WeightGoal.query.filter_by(user_id=user_id).first()
+        # Column query instead of a full ORM object: only the fields the
+        # response needs cross the wire, and the two progress subtractions
+        # happen in the database. The Row exposes the same attributes
+        # get_current_phase_info reads off a WeightGoal instance
+        goal = db.session.query(
+            WeightGoal.current_phase,
+            WeightGoal.phase_start_date,
+            WeightGoal.target_date,
+            WeightGoal.daily_calorie_target,
+            WeightGoal.daily_protein_target,
+            WeightGoal.daily_carbs_target,
+            WeightGoal.daily_fat_target,
+            WeightGoal.current_weight,
+            WeightGoal.goal_weight,
+            (WeightGoal.starting_weight - WeightGoal.current_weight).label('weight_lost'),
+            (WeightGoal.current_weight - WeightGoal.goal_weight).label('weight_remaining')
+        ).filter_by(user_id=user_id).one_or_none()
 
         if not goal:
             return jsonify({"error": "No weight goal found for this user"}), 404
@@ -225,10 +337,6 @@ def get_current_phase(user_id):
         # Get phase info
         phase_info = get_current_phase_info(goal)
 
-        # Calculate progress
-        weight_lost = float(goal.starting_weight) - float(goal.current_weight)
-        weight_remaining = float(goal.current_weight) - float(goal.goal_weight)
-
         return jsonify({
             'success': True,
             'data': {
@@ -239,8 +347,8 @@ def get_current_phase(user_id):
                 'daily_fat_target': goal.daily_fat_target,
                 'current_weight': float(goal.current_weight),
                 'goal_weight': float(goal.goal_weight),
-                'weight_lost': round(weight_lost, 1),
-                'weight_remaining': round(weight_remaining, 1)
+                'weight_lost': round(float(goal.weight_lost), 1),
+                'weight_remaining': round(float(goal.weight_remaining), 1)
             }
         }), 200
 
@@ -257,7 +365,7 @@ def update_phase():
         if not data.get('user_id') or not data.get('new_phase'):
             return jsonify({"error": "user_id and new_phase are required"}), 400
 
-        goal = WeightGoal.query.filter_by(user_id=data['user_id']).first()
+        goal = _get_goal_for_update(data['user_id'])
 
         if not goal:
             return jsonify({"error": "No weight goal found for this user"}), 404
@@ -277,6 +385,8 @@ def update_phase():
             goal.daily_fat_target = data['daily_fat_target']
 
         db.session.commit()
+        with _GOAL_CACHE_LOCK:
+            _GOAL_CACHE.pop(data['user_id'], None)
 
         return jsonify({
             'success': True,
@@ -292,7 +402,7 @@ def update_phase():
 def get_weight_goal(user_id):
     """Get weight goal for a user"""
     try:
-        goal = WeightGoal.query.filter_by(user_id=user_id).first()
+        goal = _get_goal(user_id)
 
         if not goal:
             return jsonify({"error": "No weight goal found for this user"}), 404
@@ -314,39 +424,48 @@ def get_daily_review(user_id):
     """
     try:
         from app.models import Meal, WeightGoal
-        from sqlalchemy import func
+        from sqlalchemy import Float, Integer, cast, func
 
         # Get date parameter or default to today
-        date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
+        date_str = request.args.get('date', datetime.now().date().isoformat())
 
         try:
-            review_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+            review_date = date.fromisoformat(date_str)
         except ValueError:
             return jsonify({'success': False, 'error': 'Invalid date format. Use YYYY-MM-DD'}), 400
 
-        # Get all meals for the date
-        meals = Meal.query.filter(
+        # Aggregate the day's totals and pull the goal targets as scalar
+        # subqueries in the same SELECT - one round trip covers both the
+        # meals aggregate and the independent WeightGoal lookup
+        calorie_target_sq = db.session.query(
+            WeightGoal.daily_calorie_target
+        ).filter_by(user_id=user_id).scalar_subquery()
+        protein_target_sq = db.session.query(
+            WeightGoal.daily_protein_target
+        ).filter_by(user_id=user_id).scalar_subquery()
+
+        (meal_count, total_calories, total_protein, total_carbs, total_fat,
+         calorie_target, protein_target) = db.session.query(
+            func.count(Meal.id),
+            # SUM over INTEGER is DECIMAL on MySQL; cast back so
+            # total_calories stays an int on the wire like the baseline
+            cast(func.coalesce(func.sum(Meal.calories), 0), Integer),
+            func.coalesce(cast(func.sum(Meal.protein), Float), 0.0),
+            func.coalesce(cast(func.sum(Meal.carbs), Float), 0.0),
+            func.coalesce(cast(func.sum(Meal.fat), Float), 0.0),
+            calorie_target_sq,
+            protein_target_sq
+        ).filter(
             Meal.user_id == user_id,
             Meal.meal_date == review_date
-        ).all()
+        ).one()
 
-        if not meals:
+        if meal_count == 0:
             return jsonify({'success': False, 'error': 'No meals found for this date'}), 404
 
-        # Calculate totals
-        total_calories = sum(meal.calories or 0 for meal in meals)
-        total_protein = sum(float(meal.protein or 0) for meal in meals)
-        total_carbs = sum(float(meal.carbs or 0) for meal in meals)
-        total_fat = sum(float(meal.fat or 0) for meal in meals)
-
-        # Get weight goal for targets
-        goal = WeightGoal.query.filter_by(user_id=user_id).first()
-        if not goal:
+        if calorie_target is None:
             return jsonify({'success': False, 'error': 'No weight goal found. Please set up your weight goal first.'}), 404
 
-        calorie_target = goal.daily_calorie_target
-        protein_target = goal.daily_protein_target
-
         # Calculate variances
         calorie_variance = total_calories - calorie_target
         protein_variance = total_protein - protein_target
@@ -356,16 +475,7 @@ def get_daily_review(user_id):
         pro_percent_off = abs(protein_variance) / protein_target * 100 if protein_target > 0 else 0
         max_percent_off = max(cal_percent_off, pro_percent_off)
 
-        if max_percent_off <= 5:
-            grade = 'A'
-        elif max_percent_off <= 10:
-            grade = 'B'
-        elif max_percent_off <= 20:
-            grade = 'C'
-        elif max_percent_off <= 30:
-            grade = 'D'
-        else:
-            grade = 'F'
+        grade = _GRADES[bisect_left(_GRADE_CUTOFFS, max_percent_off)]
 
         # Generate AI feedback (rule-based for now)
         ai_feedback = generate_nutrition_feedback(
@@ -442,70 +552,75 @@ def get_weekly_summary(user_id):
     """
     try:
         from app.models import Meal, WeightGoal
-        from collections import defaultdict
+        from sqlalchemy import Float, and_, case, cast, func
 
         weeks = int(request.args.get('weeks', 4))
         if weeks not in [2, 4, 8]:
             weeks = 4  # Default to 4 if invalid
 
         # Get weight goal for targets
-        goal = WeightGoal.query.filter_by(user_id=user_id).first()
+        goal = _get_goal(user_id)
         if not goal:
             return jsonify({'success': False, 'error': 'No weight goal found'}), 404
 
         calorie_target = goal.daily_calorie_target
         protein_target = goal.daily_protein_target
 
-        # Calculate date range
-        today = datetime.now().date()
-
-        weeks_data = []
-
+        # Calculate the Monday-Sunday bounds of each requested week using
+        # plain ordinal integers; weekday(ord) == (ord - 1) % 7 since
+        # ordinal 1 is a Monday
+        today_ord = datetime.now().toordinal()
+        week_bounds = []
         for week_num in range(weeks):
-            # Calculate week start (Monday) and end (Sunday)
             days_back = (week_num + 1) * 7
-            week_end = today - timedelta(days=days_back)
-            week_end = week_end + timedelta(days=(6 - week_end.weekday()))  # Move to Sunday
-            week_start = week_end - timedelta(days=6)  # Monday
-
-            # Get all meals in this week
-            meals = Meal.query.filter(
-                Meal.user_id == user_id,
-                Meal.meal_date >= week_start,
-                Meal.meal_date <= week_end
-            ).all()
-
-            if not meals:
-                continue
-
-            # Group by date and calculate daily totals
-            daily_totals = defaultdict(lambda: {'calories': 0, 'protein': 0, 'carbs': 0, 'fat': 0})
-
-            for meal in meals:
-                date_key = meal.meal_date.isoformat()
-                daily_totals[date_key]['calories'] += meal.calories or 0
-                daily_totals[date_key]['protein'] += float(meal.protein or 0)
-                daily_totals[date_key]['carbs'] += float(meal.carbs or 0)
-                daily_totals[date_key]['fat'] += float(meal.fat or 0)
-
-            if not daily_totals:
-                continue
-
-            # Calculate weekly averages
-            num_days = len(daily_totals)
-            avg_calories = sum(d['calories'] for d in daily_totals.values()) / num_days
-            avg_protein = sum(d['protein'] for d in daily_totals.values()) / num_days
-            avg_carbs = sum(d['carbs'] for d in daily_totals.values()) / num_days
-            avg_fat = sum(d['fat'] for d in daily_totals.values()) / num_days
-
-            # Calculate compliance rate (% of days within ±10% of targets)
-            compliant_days = 0
-            for day_data in daily_totals.values():
-                cal_within = abs(day_data['calories'] - calorie_target) / calorie_target <= 0.10
-                pro_within = abs(day_data['protein'] - protein_target) / protein_target <= 0.10
-                if cal_within and pro_within:
-                    compliant_days += 1
+            week_end_ord = today_ord - days_back
+            week_end_ord += 6 - (week_end_ord - 1) % 7  # Move to Sunday
+            week_bounds.append((
+                date.fromordinal(week_end_ord - 6),  # Monday
+                date.fromordinal(week_end_ord)
+            ))
+
+        range_start = min(start for start, _ in week_bounds)
+        range_end = max(end for _, end in week_bounds)
+
+        # Two-level aggregation in one round trip: inner query totals per
+        # day, outer query averages those days per week and counts the ones
+        # within +-10% of both targets. The week bucket is a CASE ladder over
+        # the precomputed Monday-Sunday bounds, which compiles on any backend
+        daily = db.session.query(
+            Meal.meal_date.label('meal_date'),
+            func.sum(Meal.calories).label('calories'),
+            func.sum(Meal.protein).label('protein'),
+            func.sum(Meal.carbs).label('carbs'),
+            func.sum(Meal.fat).label('fat')
+        ).filter(
+            Meal.user_id == user_id,
+            Meal.meal_date >= range_start,
+            Meal.meal_date <= range_end
+        ).group_by(Meal.meal_date).subquery()
+
+        week_bucket = case(*[
+            (daily.c.meal_date.between(week_start, week_end), week_num)
+            for week_num, (week_start, week_end) in enumerate(week_bounds)
+        ])
+        day_compliant = case((and_(
+            cast(func.abs(daily.c.calories - calorie_target), Float) / calorie_target <= 0.10,
+            cast(func.abs(daily.c.protein - protein_target), Float) / protein_target <= 0.10
+        ), 1), else_=0)
+
+        weekly_rows = db.session.query(
+            week_bucket.label('week_num'),
+            cast(func.avg(daily.c.calories), Float),
+            cast(func.avg(daily.c.protein), Float),
+            cast(func.avg(daily.c.carbs), Float),
+            cast(func.avg(daily.c.fat), Float),
+            func.sum(day_compliant),
+            func.count()
+        ).group_by('week_num').all()
 
+        weeks_data = []
+        for week_num, avg_calories, avg_protein, avg_carbs, avg_fat, compliant_days, num_days in weekly_rows:
+            week_start, week_end = week_bounds[week_num]
             compliance_rate = (compliant_days / num_days) * 100 if num_days > 0 else 0
 
             weeks_data.append({
@@ -539,35 +654,40 @@ def check_plateau(user_id):
     Returns plateau status and recommendations
     """
     try:
-        from collections import defaultdict
+        from sqlalchemy import func
 
-        # Get last 4 weeks of weight entries
+        # Get last 4 weeks of weight entries, pre-aggregated per day in SQL:
+        # only one (sum, count) row per logged day crosses the wire instead
+        # of every raw entry
         four_weeks_ago = datetime.now().date() - timedelta(weeks=4)
-        entries = WeightEntry.query.filter(
+        daily_rows = db.session.query(
+            WeightEntry.date,
+            func.sum(WeightEntry.weight_kg),
+            func.count(WeightEntry.id)
+        ).filter(
             WeightEntry.user_id == user_id,
             WeightEntry.date >= four_weeks_ago
-        ).order_by(WeightEntry.date.asc()).all()
+        ).group_by(WeightEntry.date).all()
 
-        if len(entries) < 8:  # Need at least 2 entries per week
+        entry_count = sum(row[2] for row in daily_rows)
+        if entry_count < 8:  # Need at least 2 entries per week
             return jsonify({
                 'success': False,
                 'error': 'Insufficient data. Need at least 8 weight entries over 4 weeks for plateau detection.'
             }), 404
 
-        # Group by week and calculate weekly averages
-        weekly_weights = defaultdict(list)
-
-        for entry in entries:
-            # Get week number from date
-            week_num = (entry.date - four_weeks_ago).days // 7
-            weekly_weights[week_num].append(float(entry.weight_kg))
+        # Fold the daily sums into per-week sums/counts; sum-of-sums over
+        # sum-of-counts gives the exact mean over all entries in the week
+        weekly_sums = {}
+        for entry_date, day_sum, day_count in daily_rows:
+            week_num = (entry_date - four_weeks_ago).days // 7
+            week_sum, week_count = weekly_sums.get(week_num, (0.0, 0))
+            weekly_sums[week_num] = (week_sum + float(day_sum), week_count + day_count)
 
-        # Calculate weekly averages
-        weekly_avgs = []
-        for week in sorted(weekly_weights.keys()):
-            if weekly_weights[week]:
-                avg = sum(weekly_weights[week]) / len(weekly_weights[week])
-                weekly_avgs.append(avg)
+        weekly_avgs = [
+            weekly_sums[week][0] / weekly_sums[week][1]
+            for week in sorted(weekly_sums.keys())
+        ]
 
         if len(weekly_avgs) < 3:
             return jsonify({
@@ -576,16 +696,7 @@ def check_plateau(user_id):
             }), 404
 
         # Check for plateau (3+ consecutive weeks with <0.25kg change)
-        weeks_stalled = 0
-        max_stall = 0
-
-        for i in range(1, len(weekly_avgs)):
-            change = abs(weekly_avgs[i] - weekly_avgs[i-1])
-            if change < 0.25:
-                weeks_stalled += 1
-                max_stall = max(max_stall, weeks_stalled)
-            else:
-                weeks_stalled = 0
+        max_stall = _max_stall(weekly_avgs)
 
         is_plateau = max_stall >= 3
 
@@ -599,7 +710,7 @@ def check_plateau(user_id):
         recommendation = ""
         if is_plateau:
             # Get current phase to tailor recommendation
-            goal = WeightGoal.query.filter_by(user_id=user_id).first()
+            goal = _get_goal(user_id)
             phase = goal.current_phase if goal else 'fat_loss'
 
             if max_stall >= 4:
@@ -634,7 +745,6 @@ def get_meal_timing(user_id):
     """
     try:
         from app.models import Meal
-        from collections import defaultdict
 
         days = int(request.args.get('days', 7))
         if days not in [7, 14, 30]:
@@ -655,63 +765,53 @@ def get_meal_timing(user_id):
                 'data': []
             }), 200
 
-        # Group by date
-        meals_by_date = defaultdict(list)
+        # Group seconds-since-midnight per day, keyed by the date object
+        # itself: one small int list per day instead of hashing isoformat
+        # strings and keeping whole Meal objects around (use meal_time if
+        # available, fallback to created_at)
+        meals_by_date = {}
         for meal in meals:
-            meals_by_date[meal.meal_date.isoformat()].append(meal)
+            t = meal.meal_time or meal.created_at.time()
+            day_seconds = meals_by_date.get(meal.meal_date)
+            if day_seconds is None:
+                day_seconds = []
+                meals_by_date[meal.meal_date] = day_seconds
+            day_seconds.append(t.hour * 3600 + t.minute * 60 + t.second)
 
         timing_data = []
 
-        # Analyze each date
-        for date_str in sorted(meals_by_date.keys()):
-            day_meals = meals_by_date[date_str]
-
-            if not day_meals:
-                continue
-
-            # Get meal times (use meal_time if available, fallback to created_at)
-            meal_datetimes = []
-            for meal in day_meals:
-                if meal.meal_time:
-                    # Use meal_time (TIME column)
-                    meal_dt = datetime.combine(datetime.today(), meal.meal_time)
-                else:
-                    # Fallback to created_at
-                    meal_dt = meal.created_at
-
-                meal_datetimes.append(meal_dt)
+        def _hhmm(seconds):
+            hours, remainder = divmod(int(seconds), 3600)
+            return f'{hours:02d}:{remainder // 60:02d}'
 
-            # Sort by time
-            meal_datetimes.sort()
+        # Analyze each date; the eating window is a single min/max spread
+        # instead of sorted datetime arithmetic
+        for meal_date in sorted(meals_by_date.keys()):
+            date_str = meal_date.isoformat()
+            seconds = np.asarray(meals_by_date[meal_date], dtype=np.int32)
 
-            if len(meal_datetimes) < 2:
+            if len(seconds) < 2:
                 # Only 1 meal = 0 hour window (compliant)
-                first_time = meal_datetimes[0] if meal_datetimes else None
-                if first_time:
-                    timing_data.append({
-                        'date': date_str,
-                        'first_meal_time': first_time.strftime('%H:%M'),
-                        'last_meal_time': first_time.strftime('%H:%M'),
-                        'eating_window_hours': 0.0,
-                        'is_16_8_compliant': True
-                    })
+                first_time = _hhmm(seconds[0])
+                timing_data.append({
+                    'date': date_str,
+                    'first_meal_time': first_time,
+                    'last_meal_time': first_time,
+                    'eating_window_hours': 0.0,
+                    'is_16_8_compliant': True
+                })
                 continue
 
-            # Get first and last meal times
-            first_meal = meal_datetimes[0]
-            last_meal = meal_datetimes[-1]
-
-            # Calculate eating window in hours
-            window_delta = last_meal - first_meal
-            window_hours = window_delta.total_seconds() / 3600
+            # Calculate eating window in hours from the peak-to-peak spread
+            window_hours = float(np.ptp(seconds)) / 3600
 
             # 16:8 compliance = eating window <= 8 hours
             is_compliant = window_hours <= 8.0
 
             timing_data.append({
                 'date': date_str,
-                'first_meal_time': first_meal.strftime('%H:%M'),
-                'last_meal_time': last_meal.strftime('%H:%M'),
+                'first_meal_time': _hhmm(seconds.min()),
+                'last_meal_time': _hhmm(seconds.max()),
                 'eating_window_hours': round(window_hours, 2),
                 'is_16_8_compliant': is_compliant
             })
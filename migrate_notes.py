@@ -10,10 +10,11 @@ Run this script with: python migrate_notes.py
 from app import create_app, db
 from app.models import Note, User
 import sys
-import io
 
-# Fix encoding for Windows console
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+# Fix encoding for Windows console; elsewhere stdout is already UTF-8 and
+# re-wrapping it would discard the existing buffering behaviour
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8')
 
 def run_migration():
     app = create_app()
@@ -23,11 +24,11 @@ def run_migration():
             print("Starting database migration...")
             print("=" * 50)
 
-            # Check if reminders table exists
+            # Check if reminders table exists - has_table() is a single
+            # targeted lookup instead of listing every table in the schema
             inspector = db.inspect(db.engine)
-            existing_tables = inspector.get_table_names()
 
-            if 'reminders' in existing_tables:
+            if inspector.has_table('reminders'):
                 print("✓ Found 'reminders' table. Dropping it...")
                 db.session.execute(db.text("DROP TABLE IF EXISTS reminders"))
                 db.session.commit()
@@ -36,7 +37,7 @@ def run_migration():
                 print("ℹ 'reminders' table does not exist (skipping drop)")
 
             # Create notes table if it doesn't exist
-            if 'notes' not in existing_tables:
+            if not inspector.has_table('notes'):
                 print("✓ Creating 'notes' table...")
                 Note.__table__.create(db.engine)
                 db.session.commit()
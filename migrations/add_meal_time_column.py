@@ -2,6 +2,12 @@
 Migration: Add meal_time column to meals table
 Date: 2025-12-03
 Description: Adds a TIME column to store the actual meal time separately from created_at timestamp
+
+meal_time must stay a real (non-generated) column: the food endpoints accept
+a user-supplied meal time and write it explicitly on insert, which a
+GENERATED ALWAYS AS (TIME(created_at)) column would reject. created_at is
+only the fallback for rows that predate the column, hence the one-off
+backfill below.
 """
 
 import sys
@@ -11,58 +17,161 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from app import create_app, db
-from sqlalchemy import text
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import OperationalError
+from migration_utils import batch_alter, get_logger
+
+logger = get_logger(__name__)
+
+# Rows backfilled per transaction; 10k keeps each chunk's lock and undo-log
+# footprint small without paying per-row commit overhead
+BATCH_SIZE = 10000
+
+# Progress is logged once per this many backfill batches, not per batch
+LOG_EVERY_N_BATCHES = 10
+
+# Statements compiled once at import; upgrade()/downgrade() just execute
+# them. The INSTANT variant carries no LOCK clause: MySQL rejects LOCK
+# together with ALGORITHM=INSTANT, and INSTANT is metadata-only so it
+# never blocks DML anyway
+ADD_MEAL_TIME_INSTANT = batch_alter('meals', [
+    "ADD COLUMN meal_time TIME NULL",
+    "ALGORITHM=INSTANT"
+])
+ADD_MEAL_TIME_INPLACE = batch_alter('meals', [
+    "ADD COLUMN meal_time TIME NULL",
+    "ALGORITHM=INPLACE",
+    "LOCK=NONE"
+])
+# Keyset-paginated backfill: each chunk walks the primary key from the
+# last id seen instead of re-running UPDATE ... LIMIT, which rescans the
+# table head on every iteration. The targeted UPDATE then touches exactly
+# the selected rows in PK order
+SELECT_BACKFILL_IDS = text(
+    "SELECT id FROM meals WHERE id > :last_id AND meal_time IS NULL "
+    f"ORDER BY id LIMIT {BATCH_SIZE}"
+)
+BACKFILL_BY_IDS = text(
+    "UPDATE meals SET meal_time = TIME(created_at) WHERE id IN :ids"
+).bindparams(bindparam('ids', expanding=True))
+
+# Idempotency probes: both are O(1) lookups, so a re-run after a partial
+# or completed migration skips the ALTER and the full-table backfill scan
+HAS_MEAL_TIME = text(
+    "SELECT 1 FROM information_schema.COLUMNS "
+    "WHERE table_schema = DATABASE() AND table_name = 'meals' "
+    "AND column_name = 'meal_time'"
+)
+NEEDS_BACKFILL = text("SELECT 1 FROM meals WHERE meal_time IS NULL LIMIT 1")
+
+# MySQL errors 1845/1846: the requested ALTER ALGORITHM is not supported
+# (pre-8.0.12 servers, or operations INSTANT cannot handle). Only these
+# warrant the INPLACE retry; anything else must propagate
+_ALGORITHM_NOT_SUPPORTED = (1845, 1846)
 
-def upgrade():
-    """Add meal_time column to meals table"""
-    app = create_app()
 
+def _algorithm_not_supported(error):
+    """True if the OperationalError is MySQL rejecting the ALGORITHM clause."""
+    return getattr(error.orig, 'args', (None,))[0] in _ALGORITHM_NOT_SUPPORTED
+
+def upgrade(app):
+    """Add meal_time column to meals table"""
     with app.app_context():
         try:
-            # Add meal_time column
-            print("Adding meal_time column to meals table...")
-            db.session.execute(text(
-                "ALTER TABLE meals ADD COLUMN meal_time TIME NULL AFTER meal_date"
-            ))
-            db.session.commit()
-            print("✓ Successfully added meal_time column")
-
-            # Optional: Migrate existing data - set meal_time from created_at
-            print("\nMigrating existing data...")
-            db.session.execute(text(
-                "UPDATE meals SET meal_time = TIME(created_at) WHERE meal_time IS NULL"
-            ))
-            db.session.commit()
-            print("✓ Successfully migrated existing meal times from created_at")
-
-            print("\n✓ Migration completed successfully!")
+            # Add meal_time column. ALGORITHM=INSTANT (MySQL 8.0.12+) makes
+            # this a metadata-only change with no table rebuild and no DML
+            # blocking; the AFTER clause is dropped because forcing a column
+            # position requires a full rebuild and the position is cosmetic.
+            # Older servers reject INSTANT, so retry with INPLACE.
+            # Plain engine connections throughout: DDL and bulk UPDATEs gain
+            # nothing from the ORM session's unit-of-work machinery
+            with db.engine.connect() as conn:
+                has_column = conn.execute(HAS_MEAL_TIME).scalar()
+
+            if has_column:
+                logger.info("ℹ meal_time column already exists (skipping ALTER)")
+            else:
+                logger.info("Adding meal_time column to meals table...")
+                try:
+                    with db.engine.begin() as conn:
+                        conn.execute(ADD_MEAL_TIME_INSTANT)
+                except OperationalError as e:
+                    if not _algorithm_not_supported(e):
+                        raise
+                    logger.info("ℹ ALGORITHM=INSTANT not supported, retrying with INPLACE...")
+                    with db.engine.begin() as conn:
+                        conn.execute(ADD_MEAL_TIME_INPLACE)
+                logger.info("✓ Successfully added meal_time column")
+
+            # Optional: Migrate existing data - set meal_time from created_at.
+            # Chunked with one transaction per chunk so the undo log, row
+            # locks and replication lag stay bounded by BATCH_SIZE instead
+            # of the whole table
+            with db.engine.connect() as conn:
+                needs_backfill = conn.execute(NEEDS_BACKFILL).scalar()
+
+            if not needs_backfill:
+                logger.info("\nℹ No rows need a meal_time backfill (skipping)")
+            else:
+                logger.info("\nMigrating existing data...")
+                migrated = 0
+                batches = 0
+                last_id = ''
+                while True:
+                    with db.engine.begin() as conn:
+                        ids = [row[0] for row in conn.execute(
+                            SELECT_BACKFILL_IDS, {'last_id': last_id}
+                        )]
+                        if not ids:
+                            break
+                        conn.execute(BACKFILL_BY_IDS, {'ids': ids})
+                    migrated += len(ids)
+                    batches += 1
+                    last_id = ids[-1]
+                    if batches % LOG_EVERY_N_BATCHES == 0:
+                        logger.info(f"  ...{migrated} rows backfilled")
+                logger.info(f"✓ Successfully migrated {migrated} existing meal times from created_at")
+
+            logger.info("\n✓ Migration completed successfully!")
 
         except Exception as e:
-            db.session.rollback()
-            print(f"✗ Migration failed: {str(e)}")
+            logger.error(f"✗ Migration failed: {str(e)}")
             raise
 
-def downgrade():
-    """Remove meal_time column from meals table"""
-    app = create_app()
+def downgrade(app, extra_drops=None):
+    """Remove meal_time column from meals table.
+
+    extra_drops: optional list of further meals column names to drop in the
+    same ALTER, so a batched rollback pays for one statement (and at worst
+    one rebuild) instead of one per column.
+    """
+    drops = ["DROP COLUMN meal_time"]
+    drops += [f"DROP COLUMN {column}" for column in (extra_drops or [])]
 
     with app.app_context():
         try:
-            print("Removing meal_time column from meals table...")
-            db.session.execute(text(
-                "ALTER TABLE meals DROP COLUMN meal_time"
-            ))
-            db.session.commit()
-            print("✓ Successfully removed meal_time column")
+            logger.info("Removing meal_time column from meals table...")
+            # DROP COLUMN is INSTANT-capable on MySQL 8.0.29+; older
+            # servers fall back to an online INPLACE rebuild
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(batch_alter('meals', drops + ["ALGORITHM=INSTANT"]))
+            except OperationalError as e:
+                if not _algorithm_not_supported(e):
+                    raise
+                logger.info("ℹ ALGORITHM=INSTANT not supported, retrying with INPLACE...")
+                with db.engine.begin() as conn:
+                    conn.execute(batch_alter('meals', drops + ["ALGORITHM=INPLACE", "LOCK=NONE"]))
+            logger.info("✓ Successfully removed meal_time column")
 
         except Exception as e:
-            db.session.rollback()
-            print(f"✗ Rollback failed: {str(e)}")
+            logger.error(f"✗ Rollback failed: {str(e)}")
             raise
 
 if __name__ == '__main__':
     import sys
 
+    # Usage errors print directly: sys.exit(1) must not race the log buffer
     if len(sys.argv) < 2:
         print("Usage: python migrations/add_meal_time_column.py [upgrade|downgrade]")
         sys.exit(1)
@@ -70,9 +179,9 @@ if __name__ == '__main__':
     command = sys.argv[1]
 
     if command == 'upgrade':
-        upgrade()
+        upgrade(create_app())
     elif command == 'downgrade':
-        downgrade()
+        downgrade(create_app())
     else:
         print(f"Unknown command: {command}")
         print("Usage: python migrations/add_meal_time_column.py [upgrade|downgrade]")
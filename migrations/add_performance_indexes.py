@@ -0,0 +1,68 @@
+"""
+Migration: Add composite index for the hot meal queries
+Date: 2026-08-30
+Description: The daily-review, weekly-summary and meal-timing endpoints all
+filter meals by user_id plus a meal_date equality or range; without a
+composite index that is a full scan plus filesort per request. weight_entries
+already carries idx_user_date (user_id, date) from its CREATE TABLE, so only
+meals needs the new index.
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from sqlalchemy import text
+from migration_utils import get_logger
+
+logger = get_logger(__name__)
+
+def upgrade(app):
+    """Add composite (user_id, meal_date) index to meals"""
+    with app.app_context():
+        try:
+            logger.info("Creating ix_meals_user_date index on meals...")
+            with db.engine.begin() as conn:
+                conn.execute(text(
+                    "CREATE INDEX ix_meals_user_date ON meals (user_id, meal_date)"
+                ))
+            logger.info("✓ Successfully created ix_meals_user_date")
+
+        except Exception as e:
+            logger.error(f"✗ Migration failed: {str(e)}")
+            raise
+
+def downgrade(app):
+    """Drop the composite meals index"""
+    with app.app_context():
+        try:
+            logger.info("Dropping ix_meals_user_date index from meals...")
+            with db.engine.begin() as conn:
+                conn.execute(text(
+                    "DROP INDEX ix_meals_user_date ON meals"
+                ))
+            logger.info("✓ Successfully dropped ix_meals_user_date")
+
+        except Exception as e:
+            logger.error(f"✗ Rollback failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    # Usage errors print directly: sys.exit(1) must not race the log buffer
+    if len(sys.argv) < 2:
+        print("Usage: python migrations/add_performance_indexes.py [upgrade|downgrade]")
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == 'upgrade':
+        upgrade(create_app())
+    elif command == 'downgrade':
+        downgrade(create_app())
+    else:
+        print(f"Unknown command: {command}")
+        print("Usage: python migrations/add_performance_indexes.py [upgrade|downgrade]")
+        sys.exit(1)
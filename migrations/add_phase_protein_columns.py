@@ -0,0 +1,87 @@
+"""
+Migration: Add per-phase protein target columns to weight_goals
+Date: 2026-08-30
+Description: Stores the protein target for each phase as an integer at goal
+creation time, so phase plans read precomputed values instead of recomputing
+int(starting_weight * multiplier) on every request. Existing goals are
+backfilled from starting_weight using the phase multipliers.
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from sqlalchemy import text
+from migration_utils import batch_alter, get_logger
+
+logger = get_logger(__name__)
+
+def upgrade(app):
+    """Add per-phase protein columns to weight_goals and backfill"""
+    with app.app_context():
+        try:
+            logger.info("Adding per-phase protein columns to weight_goals table...")
+            with db.engine.begin() as conn:
+                conn.execute(batch_alter('weight_goals', [
+                    "ADD COLUMN priming_protein_g INTEGER NULL",
+                    "ADD COLUMN fat_loss_protein_g INTEGER NULL",
+                    "ADD COLUMN diet_break_protein_g INTEGER NULL",
+                    "ADD COLUMN final_push_protein_g INTEGER NULL"
+                ]))
+            logger.info("✓ Successfully added per-phase protein columns")
+
+            logger.info("\nBackfilling existing goals from starting_weight...")
+            with db.engine.begin() as conn:
+                conn.execute(text(
+                    "UPDATE weight_goals SET "
+                    "priming_protein_g = FLOOR(starting_weight * 1.65), "
+                    "fat_loss_protein_g = FLOOR(starting_weight * 1.75), "
+                    "diet_break_protein_g = FLOOR(starting_weight * 1.65), "
+                    "final_push_protein_g = FLOOR(starting_weight * 1.80) "
+                    "WHERE priming_protein_g IS NULL"
+                ))
+            logger.info("✓ Successfully backfilled per-phase protein targets")
+
+            logger.info("\n✓ Migration completed successfully!")
+
+        except Exception as e:
+            logger.error(f"✗ Migration failed: {str(e)}")
+            raise
+
+def downgrade(app):
+    """Remove per-phase protein columns from weight_goals"""
+    with app.app_context():
+        try:
+            logger.info("Removing per-phase protein columns from weight_goals table...")
+            with db.engine.begin() as conn:
+                conn.execute(batch_alter('weight_goals', [
+                    "DROP COLUMN priming_protein_g",
+                    "DROP COLUMN fat_loss_protein_g",
+                    "DROP COLUMN diet_break_protein_g",
+                    "DROP COLUMN final_push_protein_g"
+                ]))
+            logger.info("✓ Successfully removed per-phase protein columns")
+
+        except Exception as e:
+            logger.error(f"✗ Rollback failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    # Usage errors print directly: sys.exit(1) must not race the log buffer
+    if len(sys.argv) < 2:
+        print("Usage: python migrations/add_phase_protein_columns.py [upgrade|downgrade]")
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == 'upgrade':
+        upgrade(create_app())
+    elif command == 'downgrade':
+        downgrade(create_app())
+    else:
+        print(f"Unknown command: {command}")
+        print("Usage: python migrations/add_phase_protein_columns.py [upgrade|downgrade]")
+        sys.exit(1)
@@ -1,6 +1,13 @@
 """
 Database migration script to add weight management tables
 Run this script to create the new tables for weight tracking, goals, and nutrition reviews.
+
+The VARCHAR(36) UUID keys are deliberate: every table in this schema keys
+and references Users.id as VARCHAR(36), and MySQL requires foreign key
+columns to match the referenced type exactly. Moving these three tables to
+BINARY(16) would halve index key bytes but forces a coordinated conversion
+of Users and all nine referencing tables (plus uuid.UUID.bytes handling in
+the models) - a schema-wide change, not something to do piecemeal here.
 """
 import sys
 import os
@@ -10,103 +17,143 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app import create_app, db
 from sqlalchemy import text
+from migration_utils import get_logger
+
+logger = get_logger(__name__)
+
+# DDL compiled once at import; PyMySQL has no multi-statement execute, so
+# upgrade() runs the statements one by one over a single connection and
+# transaction instead of opening one per statement.
+# The column boilerplate every table shares is templated once so the
+# id/FK/timestamp shapes cannot drift apart between tables
+ID_COLUMN = "id VARCHAR(36) PRIMARY KEY"
+CREATED_AT_COLUMN = "created_at DATETIME DEFAULT CURRENT_TIMESTAMP"
+USER_FK = "FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE"
+
+CREATE_WEIGHT_ENTRIES = text(f"""
+CREATE TABLE IF NOT EXISTS weight_entries (
+    {ID_COLUMN},
+    user_id VARCHAR(36) NOT NULL,
+    weight_kg DECIMAL(5,2) NOT NULL,
+    date DATE NOT NULL,
+    notes TEXT,
+    {CREATED_AT_COLUMN},
+    {USER_FK}
+)
+""")
+
+# Secondary index created after the table so an eventual bulk load of
+# historical entries doesn't pay B-tree maintenance per inserted row.
+# MySQL has no CREATE INDEX IF NOT EXISTS, so re-runs probe
+# information_schema first to stay idempotent like the CREATE TABLEs
+CREATE_WEIGHT_ENTRIES_INDEX = text(
+    "CREATE INDEX idx_user_date ON weight_entries (user_id, date)"
+)
+HAS_WEIGHT_ENTRIES_INDEX = text(
+    "SELECT 1 FROM information_schema.STATISTICS "
+    "WHERE table_schema = DATABASE() AND table_name = 'weight_entries' "
+    "AND index_name = 'idx_user_date'"
+)
+
+CREATE_WEIGHT_GOALS = text(f"""
+CREATE TABLE IF NOT EXISTS weight_goals (
+    {ID_COLUMN},
+    user_id VARCHAR(36) NOT NULL UNIQUE,
+    starting_weight DECIMAL(5,2) NOT NULL,
+    current_weight DECIMAL(5,2) NOT NULL,
+    goal_weight DECIMAL(5,2) NOT NULL,
+    height_cm INTEGER NOT NULL,
+    target_date DATE NOT NULL,
+    current_phase TINYINT UNSIGNED NOT NULL DEFAULT 0 CHECK (current_phase BETWEEN 0 AND 3),
+    phase_start_date DATE NOT NULL,
+    daily_calorie_target INTEGER NOT NULL,
+    daily_protein_target INTEGER NOT NULL,
+    daily_carbs_target INTEGER,
+    daily_fat_target INTEGER,
+    priming_protein_g INTEGER,
+    fat_loss_protein_g INTEGER,
+    diet_break_protein_g INTEGER,
+    final_push_protein_g INTEGER,
+    {CREATED_AT_COLUMN},
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    {USER_FK}
+)
+""")
+
+CREATE_NUTRITION_REVIEWS = text(f"""
+CREATE TABLE IF NOT EXISTS nutrition_reviews (
+    {ID_COLUMN},
+    user_id VARCHAR(36) NOT NULL,
+    review_date DATE NOT NULL,
+    total_calories INTEGER NOT NULL,
+    total_protein DECIMAL(5,2) NOT NULL,
+    total_carbs DECIMAL(5,2) NOT NULL,
+    total_fat DECIMAL(5,2) NOT NULL,
+    calorie_target INTEGER NOT NULL,
+    protein_target INTEGER NOT NULL,
+    adherence_score INTEGER,
+    ai_feedback TEXT NOT NULL,
+    grade VARCHAR(2),
+    {CREATED_AT_COLUMN},
+    {USER_FK},
+    UNIQUE KEY unique_user_date (user_id, review_date)
+)
+""")
+
+CREATE_TABLES = (
+    ('weight_entries', CREATE_WEIGHT_ENTRIES),
+    ('weight_goals', CREATE_WEIGHT_GOALS),
+    ('nutrition_reviews', CREATE_NUTRITION_REVIEWS),
+)
+
+
+def upgrade(app):
+    """Create new tables for weight management features"""
+    with app.app_context():
+        logger.info("Creating weight management tables...")
 
-app = create_app()
+        with db.engine.begin() as conn:
+            for table_name, ddl in CREATE_TABLES:
+                logger.info(f"Creating {table_name} table...")
+                conn.execute(ddl)
 
+            if conn.execute(HAS_WEIGHT_ENTRIES_INDEX).scalar():
+                logger.info("ℹ idx_user_date index already exists (skipping)")
+            else:
+                logger.info("Creating idx_user_date index on weight_entries...")
+                conn.execute(CREATE_WEIGHT_ENTRIES_INDEX)
 
-def upgrade():
-    """Create new tables for weight management features"""
-    with app.app_context():
-        print("Creating weight management tables...")
-
-        # Weight entries table
-        print("Creating weight_entries table...")
-        db.session.execute(text("""
-        CREATE TABLE IF NOT EXISTS weight_entries (
-            id VARCHAR(36) PRIMARY KEY,
-            user_id VARCHAR(36) NOT NULL,
-            weight_kg DECIMAL(5,2) NOT NULL,
-            date DATE NOT NULL,
-            notes TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE,
-            INDEX idx_user_date (user_id, date)
-        )
-        """))
-
-        # Weight goals table
-        print("Creating weight_goals table...")
-        db.session.execute(text("""
-        CREATE TABLE IF NOT EXISTS weight_goals (
-            id VARCHAR(36) PRIMARY KEY,
-            user_id VARCHAR(36) NOT NULL UNIQUE,
-            starting_weight DECIMAL(5,2) NOT NULL,
-            current_weight DECIMAL(5,2) NOT NULL,
-            goal_weight DECIMAL(5,2) NOT NULL,
-            height_cm INTEGER NOT NULL,
-            target_date DATE NOT NULL,
-            current_phase ENUM('priming', 'fat_loss', 'diet_break', 'final_push') DEFAULT 'priming',
-            phase_start_date DATE NOT NULL,
-            daily_calorie_target INTEGER NOT NULL,
-            daily_protein_target INTEGER NOT NULL,
-            daily_carbs_target INTEGER,
-            daily_fat_target INTEGER,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE
-        )
-        """))
-
-        # Nutrition reviews table
-        print("Creating nutrition_reviews table...")
-        db.session.execute(text("""
-        CREATE TABLE IF NOT EXISTS nutrition_reviews (
-            id VARCHAR(36) PRIMARY KEY,
-            user_id VARCHAR(36) NOT NULL,
-            review_date DATE NOT NULL,
-            total_calories INTEGER NOT NULL,
-            total_protein DECIMAL(5,2) NOT NULL,
-            total_carbs DECIMAL(5,2) NOT NULL,
-            total_fat DECIMAL(5,2) NOT NULL,
-            calorie_target INTEGER NOT NULL,
-            protein_target INTEGER NOT NULL,
-            adherence_score INTEGER,
-            ai_feedback TEXT NOT NULL,
-            grade VARCHAR(2),
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES Users(id) ON DELETE CASCADE,
-            UNIQUE KEY unique_user_date (user_id, review_date),
-            INDEX idx_user_date (user_id, review_date)
-        )
-        """))
-
-        db.session.commit()
-        print("✅ All tables created successfully!")
-
-
-def downgrade():
+    logger.info("✅ All tables created successfully!")
+
+
+def downgrade(app):
     """Drop weight management tables"""
     with app.app_context():
-        print("Dropping weight management tables...")
+        logger.info("Dropping weight management tables...")
 
-        db.session.execute(text("DROP TABLE IF EXISTS nutrition_reviews"))
-        db.session.execute(text("DROP TABLE IF EXISTS weight_goals"))
-        db.session.execute(text("DROP TABLE IF EXISTS weight_entries"))
+        # One statement, one round trip, one metadata-lock cycle; all three
+        # tables only FK to Users, so they can be dropped together in any
+        # order. IF EXISTS keeps repeat runs idempotent
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                "DROP TABLE IF EXISTS nutrition_reviews, weight_goals, weight_entries"
+            ))
 
-        db.session.commit()
-        print("✅ All tables dropped successfully!")
+    logger.info("✅ All tables dropped successfully!")
 
 
 if __name__ == '__main__':
     import sys
 
+    # Interactive lines use print, not the buffered logger: the warning must
+    # be on screen before input() blocks, not sitting in the memory buffer
     if len(sys.argv) > 1 and sys.argv[1] == 'downgrade':
         print("⚠️  Running DOWNGRADE - This will delete all weight management data!")
         confirm = input("Are you sure? Type 'yes' to confirm: ")
         if confirm.lower() == 'yes':
-            downgrade()
+            downgrade(create_app())
         else:
             print("❌ Downgrade cancelled")
     else:
         print("Running UPGRADE - Creating new tables...")
-        upgrade()
+        upgrade(create_app())
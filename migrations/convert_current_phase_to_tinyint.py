@@ -0,0 +1,138 @@
+"""
+Migration: Convert weight_goals.current_phase from ENUM to TINYINT
+Date: 2026-08-30
+Description: The PhaseType decorator on the model now binds current_phase as
+a 1-byte integer code (priming=0, fat_loss=1, diet_break=2, final_push=3).
+Databases created by add_weight_management_tables.py before that change still
+have ENUM('priming','fat_loss','diet_break','final_push'), which the decoder
+cannot read and which would misinterpret the bound codes as 1-based enum
+indexes. This script converts the column in place.
+
+The conversion goes through a VARCHAR intermediate because MySQL offers no
+direct safe path: MODIFYing ENUM straight to an integer type stores each
+value's 1-based enum index (1-4, not our 0-3 codes), and integer codes cannot
+be UPDATEd into the column while it is still an ENUM. ENUM -> VARCHAR keeps
+the name strings, the CASE UPDATE rewrites them to digit strings, and
+VARCHAR -> TINYINT parses those digits into the codes.
+"""
+
+import sys
+import os
+
+# Add parent directory to path to import app module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from sqlalchemy import text
+from migration_utils import batch_alter, get_logger
+
+logger = get_logger(__name__)
+
+# Idempotency probe: DATA_TYPE tells upgrade/downgrade whether the column is
+# already in the shape they would produce, so re-runs are no-ops
+CURRENT_PHASE_TYPE = text(
+    "SELECT DATA_TYPE FROM information_schema.COLUMNS "
+    "WHERE table_schema = DATABASE() AND table_name = 'weight_goals' "
+    "AND column_name = 'current_phase'"
+)
+
+PHASE_TO_VARCHAR = batch_alter('weight_goals', [
+    "MODIFY current_phase VARCHAR(20) NOT NULL"
+])
+# Both UPDATEs keep unmatched values as-is (ELSE current_phase): MySQL
+# DDL commits implicitly, so a run interrupted between steps leaves the
+# column VARCHAR with the values already rewritten, and the re-run's
+# UPDATE must not NULL them out
+NAMES_TO_CODES = text(
+    "UPDATE weight_goals SET current_phase = CASE current_phase "
+    "WHEN 'priming' THEN '0' "
+    "WHEN 'fat_loss' THEN '1' "
+    "WHEN 'diet_break' THEN '2' "
+    "WHEN 'final_push' THEN '3' "
+    "ELSE current_phase END"
+)
+PHASE_TO_TINYINT = batch_alter('weight_goals', [
+    "MODIFY current_phase TINYINT UNSIGNED NOT NULL DEFAULT 0"
+])
+
+CODES_TO_NAMES = text(
+    "UPDATE weight_goals SET current_phase = CASE current_phase "
+    "WHEN '0' THEN 'priming' "
+    "WHEN '1' THEN 'fat_loss' "
+    "WHEN '2' THEN 'diet_break' "
+    "WHEN '3' THEN 'final_push' "
+    "ELSE current_phase END"
+)
+PHASE_TO_ENUM = batch_alter('weight_goals', [
+    "MODIFY current_phase "
+    "ENUM('priming', 'fat_loss', 'diet_break', 'final_push') "
+    "NOT NULL DEFAULT 'priming'"
+])
+
+def upgrade(app):
+    """Convert current_phase from ENUM names to TINYINT codes"""
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                data_type = conn.execute(CURRENT_PHASE_TYPE).scalar()
+
+            if data_type == 'tinyint':
+                logger.info("ℹ current_phase is already TINYINT (skipping)")
+                return
+
+            logger.info("Converting weight_goals.current_phase to TINYINT...")
+            # Not atomic: each MODIFY commits implicitly on MySQL, so a
+            # crash mid-conversion can leave the column VARCHAR. Every
+            # step is individually re-runnable (MODIFY to the current
+            # type is a no-op, the UPDATEs keep already-converted
+            # values), so the recovery is simply running upgrade again
+            with db.engine.begin() as conn:
+                conn.execute(PHASE_TO_VARCHAR)
+                conn.execute(NAMES_TO_CODES)
+                conn.execute(PHASE_TO_TINYINT)
+            logger.info("✓ Successfully converted current_phase to TINYINT codes")
+
+            logger.info("\n✓ Migration completed successfully!")
+
+        except Exception as e:
+            logger.error(f"✗ Migration failed: {str(e)}")
+            raise
+
+def downgrade(app):
+    """Convert current_phase back from TINYINT codes to ENUM names"""
+    with app.app_context():
+        try:
+            with db.engine.connect() as conn:
+                data_type = conn.execute(CURRENT_PHASE_TYPE).scalar()
+
+            if data_type == 'enum':
+                logger.info("ℹ current_phase is already an ENUM (skipping)")
+                return
+
+            logger.info("Converting weight_goals.current_phase back to ENUM...")
+            with db.engine.begin() as conn:
+                conn.execute(PHASE_TO_VARCHAR)
+                conn.execute(CODES_TO_NAMES)
+                conn.execute(PHASE_TO_ENUM)
+            logger.info("✓ Successfully converted current_phase back to ENUM names")
+
+        except Exception as e:
+            logger.error(f"✗ Rollback failed: {str(e)}")
+            raise
+
+if __name__ == '__main__':
+    # Usage errors print directly: sys.exit(1) must not race the log buffer
+    if len(sys.argv) < 2:
+        print("Usage: python migrations/convert_current_phase_to_tinyint.py [upgrade|downgrade]")
+        sys.exit(1)
+
+    command = sys.argv[1]
+
+    if command == 'upgrade':
+        upgrade(create_app())
+    elif command == 'downgrade':
+        downgrade(create_app())
+    else:
+        print(f"Unknown command: {command}")
+        print("Usage: python migrations/convert_current_phase_to_tinyint.py [upgrade|downgrade]")
+        sys.exit(1)
@@ -0,0 +1,45 @@
+"""
+Shared helpers for the standalone migration scripts in this directory.
+
+The scripts are run directly (python migrations/<name>.py), which puts this
+directory on sys.path, so they can import from this module without any
+package setup.
+"""
+
+import logging
+import logging.handlers
+
+from sqlalchemy import text
+
+# Flush progress output in batches of records rather than per line: on CI
+# and containerized runs every flushed line is a synchronous write to the
+# log collector, which adds up inside chunked-backfill loops
+_LOG_BUFFER_RECORDS = 64
+
+
+def get_logger(name):
+    """Return a module logger backed by a buffered stream handler."""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        # WARNING and above flush immediately; buffering is only worth it
+        # for the high-volume INFO progress lines
+        handler = logging.handlers.MemoryHandler(
+            capacity=_LOG_BUFFER_RECORDS,
+            flushLevel=logging.WARNING,
+            target=logging.StreamHandler()
+        )
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+    return logger
+
+
+def batch_alter(table, changes):
+    """
+    Build one multi-clause ALTER TABLE statement from a list of clauses
+    (e.g. ["ADD COLUMN a INT NULL", "ADD COLUMN b INT NULL"]).
+
+    MySQL rebuilds the table once per ALTER statement, so grouping every
+    change to the same table into a single statement performs one rebuild
+    instead of one per clause.
+    """
+    return text(f"ALTER TABLE {table} " + ", ".join(changes))